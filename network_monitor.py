@@ -5,7 +5,12 @@ import platform
 import subprocess
 import re
 import threading
+import queue
 import sys
+import atexit
+from collections import OrderedDict
+from ipaddress import ip_address as parse_ip_address
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import Prometheus client library for exposing metrics
 try:
@@ -24,10 +29,17 @@ except ImportError:
 # Import requests for measuring application response time
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     print("requests library not found. Please install it using: pip install requests")
     sys.exit(1)
 
+# Import icmplib to ping without spawning a process (optional, falls back to the 'ping' command)
+try:
+    import icmplib
+except ImportError:
+    icmplib = None
+
 # --- Configuration ---
 # The internet host to use for the full network audit (ping and traceroute).
 INTERNET_HOST = "8.8.8.8"
@@ -38,8 +50,23 @@ APPLICATION_URL = "https://www.google.com"
 # The name of the log file where results will be stored.
 LOG_FILE = "connection_log.txt"
 
+# The name of the log file where the full traceroute output will be stored.
+TRACEROUTE_LOG_FILE = "traceroute_log.txt"
+
 # The time to wait between each check (in seconds).
-INTERVAL = 10
+# Can be overridden with the NETWORK_MONITOR_INTERVAL environment variable.
+_interval_setting = os.environ.get("NETWORK_MONITOR_INTERVAL", "10")
+try:
+    INTERVAL = float(_interval_setting)
+except ValueError:
+    INTERVAL = None
+if INTERVAL is None or not 0 < INTERVAL < float("inf"):
+    print(f"Invalid NETWORK_MONITOR_INTERVAL '{_interval_setting}'. It must be a positive number of seconds.")
+    sys.exit(1)
+
+# While the internet connection is down, back off the traceroute and application
+# checks exponentially (they only run after 1, 2, 4, 8, ... consecutive failed pings).
+OUTAGE_BACKOFF_ENABLED = True
 
 # The port for the Prometheus metrics endpoint.
 PROMETHEUS_PORT = 8000
@@ -47,12 +74,27 @@ PROMETHEUS_PORT = 8000
 # Set this to True to print the shell commands being executed.
 VERBOSE = True
 
+# Set this to False to skip WHOIS lookups for traceroute hops entirely (e.g. on constrained devices).
+WHOIS_ENABLED = True
+
+# WHOIS lookups are cached per IP to avoid running 'whois' for every hop on every check.
+WHOIS_CACHE_SIZE = 1000
+WHOIS_CACHE_TTL = 86400 # 24 hours, in seconds
+
+# The maximum number of WHOIS lookups to run in parallel for a traceroute.
+WHOIS_MAX_WORKERS = 8
+
 # --- ANSI Color Codes for Console Output ---
 GREEN = '\033[92m'
 YELLOW = '\033[93m'
 RED = '\033[91m'
 RESET = '\033[0m'
 
+# --- Console Output Formats ---
+_HOP_LINE_FORMAT = "\n  Hop {hop}: {hostname} ({ip}) ({latency}ms)"
+_HOP_LINE_NO_LATENCY_FORMAT = "\n  Hop {hop}: {hostname} ({ip})"
+_WHOIS_LINE_FORMAT = "\n    - Owned by: {org_name}, Country: {country}"
+
 # --- Sound File Configuration ---
 # Make sure to set these paths to your .wav file locations.
 SOUND_ENABLED = True
@@ -70,54 +112,233 @@ bytes_transmitted_gauge = Gauge('network_bytes_transmitted_total', 'Total bytes
 APPLICATION_RESPONSE_TIME_GAUGE = Gauge('network_application_response_time_ms', 'Application response time in milliseconds.')
 packets_dropped_gauge = Gauge('network_packets_dropped_total', 'Total packets dropped on the network interface.')
 
+# Maps (hop, ip, hostname) label values to their TRACEROUTE_HOP_LATENCY child, so the
+# children for a stable path are reused instead of being cleared and recreated every cycle.
+_HOP_LATENCY_CHILDREN = {}
+
+# --- Output Parsing Patterns ---
+# Compiled once at import time instead of on every check.
+_RE_PING_LOSS_WIN = re.compile(r'\((\d+)% loss\)')
+_RE_PING_AVG_WIN = re.compile(r'Average = (\d+)ms')
+_RE_PING_LOSS_NIX = re.compile(r'(\d+)% packet loss')
+_RE_PING_AVG_NIX = re.compile(r'min/avg/max/mdev = [\d.]+/([\d.]+)/[\d.]+/[\d.]+ ms')
+# WHOIS output is searched as raw bytes, only the matched fields are decoded.
+_RE_WHOIS_ORG = re.compile(rb'(?:OrgName|organization|descr):\s+([^\r\n]+)', re.IGNORECASE)
+_RE_WHOIS_COUNTRY = re.compile(rb'country:\s+([^\r\n]+)', re.IGNORECASE)
+# Matches either a responding hop ("name [ip]" or a bare ip) or a timed-out hop ("* * *") in one pass.
+_RE_HOP_WIN = re.compile(
+    r'^\s*(\d+)\s+(?:'
+    r'(<?[\d.]+\s*ms|\*)\s+(?:<?[\d.]+\s*ms|\*)\s+(?:<?[\d.]+\s*ms|\*)\s+(?:([^\s\[]+)\s+\[([\d.]+)\]|([\d.]+))'
+    r'|\*\s+\*\s+\*)'
+)
+_RE_HOP_NIX = re.compile(r'^\s*(\d+)\s+([^\s]+)\s+\(([\d.]+)\).*?([\d.]+) ms')
+_RE_HOP_TIMEOUT_NIX = re.compile(r'^\s*\d+\s+\* \*\s*\*.*')
+
+# --- HTTP Session ---
+# A single persistent session keeps the connection to the application alive between
+# checks, so the measured response time doesn't include a new TCP and TLS handshake.
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+_HTTP_SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+# --- Sound Queue ---
+# Alerts are played one at a time by a single background worker. While an alert
+# is already waiting, new ones are dropped so they don't pile up on a flaky link.
+_SOUND_QUEUE = queue.Queue(maxsize=1)
+
+# --- Log Files ---
+# Opened once by open_log_files() and kept open for the lifetime of the process.
+_log_file = None
+_traceroute_log_file = None
+
+# --- WHOIS Cache ---
+# Maps an IP address to a (timestamp, whois_info) tuple, oldest entries first.
+_WHOIS_CACHE = OrderedDict()
+_WHOIS_CACHE_LOCK = threading.Lock()
+
 
 # --- Sound Playback Function (macOS specific) ---
 def play_sound_mac(file_path):
     """
     Plays a sound file using the native macOS 'afplay' command.
+    Returns the afplay process, or None if it could not be started.
     """
     try:
         # Popen is used to avoid blocking the main script
-        subprocess.Popen(['afplay', file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return subprocess.Popen(['afplay', file_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=_CLOSE_FDS)
     except Exception as e:
         print(f"Error playing sound with afplay: {e}")
+        return None
+
+def sound_worker():
+    """
+    Plays the sound files put on the sound queue, for the lifetime of the process.
+    """
+    while True:
+        file_path = _SOUND_QUEUE.get()
+        process = play_sound_mac(file_path)
+        if process:
+            # Wait for the sound to finish so alerts never overlap
+            process.wait()
+
+def queue_sound(file_path):
+    """
+    Queues a sound file to be played by the sound worker, unless one is already waiting.
+    """
+    try:
+        _SOUND_QUEUE.put_nowait(file_path)
+    except queue.Full:
+        pass
+
+def open_log_files():
+    """
+    Opens the connection and traceroute log files in line-buffered append mode,
+    so each line is flushed to disk without reopening the files every cycle.
+    """
+    global _log_file, _traceroute_log_file
+    _log_file = open(LOG_FILE, "a", buffering=1)
+    _traceroute_log_file = open(TRACEROUTE_LOG_FILE, "a", buffering=1)
+    atexit.register(_log_file.close)
+    atexit.register(_traceroute_log_file.close)
+
+# --- Output Parsing Functions ---
+def parse_ping_output_windows(output):
+    """
+    Parses the output of the Windows 'ping' command and returns a tuple of
+    (packet_loss_percent, avg_latency_ms).
+    """
+    packet_loss_match = _RE_PING_LOSS_WIN.search(output)
+    avg_latency_match = _RE_PING_AVG_WIN.search(output)
+
+    packet_loss = int(packet_loss_match.group(1)) if packet_loss_match else 100
+    avg_latency = int(avg_latency_match.group(1)) if avg_latency_match else -1
+    return packet_loss, avg_latency
+
+def parse_ping_output_unix(output):
+    """
+    Parses the output of the Linux/macOS 'ping' command and returns a tuple of
+    (packet_loss_percent, avg_latency_ms).
+    """
+    packet_loss_match = _RE_PING_LOSS_NIX.search(output)
+    avg_latency_match = _RE_PING_AVG_NIX.search(output)
+
+    packet_loss = int(packet_loss_match.group(1)) if packet_loss_match else 100
+    avg_latency = float(avg_latency_match.group(1)) if avg_latency_match else -1
+    return packet_loss, avg_latency
+
+def parse_traceroute_line_windows(line):
+    """
+    Parses a single line of Windows 'tracert' output and returns a hop
+    dictionary, or None if the line does not describe a hop.
+    """
+    match = _RE_HOP_WIN.search(line)
+    if not match:
+        return None
+    if match.group(2) is None:
+        return {
+            "hop": int(match.group(1)),
+            "hostname": "Timed Out",
+            "ip": "Timed Out",
+            "latency": -1,
+            "whois": {"org_name": "N/A", "country": "N/A"}
+        }
+
+    # Hops without a reverse DNS name are printed as a bare IP address
+    ip_address = match.group(4) or match.group(5)
+    return {
+        "hop": int(match.group(1)),
+        "hostname": match.group(3) or ip_address,
+        "ip": ip_address,
+        "latency": -1, # No simple latency data
+        "whois": None
+    }
+
+def parse_traceroute_line_unix(line):
+    """
+    Parses a single line of Linux/macOS 'traceroute' output and returns a hop
+    dictionary, or None if the line does not describe a hop.
+    """
+    match = _RE_HOP_NIX.search(line)
+    if match:
+        return {
+            "hop": int(match.group(1)),
+            "hostname": match.group(2),
+            "ip": match.group(3),
+            "latency": float(match.group(4)),
+            "whois": None
+        }
+    if _RE_HOP_TIMEOUT_NIX.search(line):
+        return {
+            "hop": int(line.strip().split()[0]),
+            "hostname": "Timed Out",
+            "ip": "Timed Out",
+            "latency": -1,
+            "whois": {"org_name": "N/A", "country": "N/A"}
+        }
+    return None
+
+# --- Platform-Specific Commands ---
+# The OS is resolved once at import time so the checks don't branch on it every cycle.
+_IS_WINDOWS = platform.system() == 'Windows'
+if _IS_WINDOWS:
+    _PING_COMMAND = ['ping', '-n', '4'] # Ping with 4 packets
+    _TRACEROUTE_COMMAND = ['tracert', '-w', '1000'] # -w sets timeout to 1 sec
+    _parse_ping_output = parse_ping_output_windows
+    _parse_traceroute_line = parse_traceroute_line_windows
+else: # Linux, macOS, etc.
+    _PING_COMMAND = ['ping', '-c', '4'] # Ping with 4 packets
+    _TRACEROUTE_COMMAND = ['traceroute', '-w', '1'] # -w sets timeout to 1 sec
+    _parse_ping_output = parse_ping_output_unix
+    _parse_traceroute_line = parse_traceroute_line_unix
+
+# Python opens its own file descriptors as non-inheritable, so on Linux/macOS there is
+# nothing to gain from closing every descriptor before each 'ping', 'traceroute' or
+# 'whois' fork; the Windows default is kept.
+_CLOSE_FDS = _IS_WINDOWS
 
 def check_connection(host):
     """
     Pings a single host and returns a dictionary with connection metrics.
     Metrics include: success, packet_loss_percent, and avg_latency_ms.
+    Uses icmplib when it is available and permitted, otherwise the 'ping' command.
+    """
+    if icmplib is not None:
+        try:
+            if VERBOSE:
+                print(f"Pinging {host} with icmplib")
+
+            result = icmplib.ping(host, count=4, timeout=2, privileged=False)
+            packet_loss = round(result.packet_loss * 100)
+            return {
+                "success": result.is_alive,
+                "packet_loss": packet_loss,
+                "avg_latency": result.avg_rtt if result.is_alive else -1
+            }
+        except (icmplib.SocketPermissionError, PermissionError):
+            # Unprivileged ICMP sockets are not allowed here, use the ping command instead
+            pass
+        except icmplib.ICMPLibError:
+            return {
+                "success": False,
+                "packet_loss": 100,
+                "avg_latency": -1
+            }
+
+    return check_connection_with_ping_command(host)
+
+def check_connection_with_ping_command(host):
+    """
+    Pings a single host using the system 'ping' command and returns a dictionary
+    with connection metrics.
     """
-    system_os = platform.system()
     try:
-        if system_os == 'Windows':
-            # Ping with 4 packets and capture output
-            command = ['ping', '-n', '4', host]
-        else:  # Linux, macOS, etc.
-            # Ping with 4 packets and capture output
-            command = ['ping', '-c', '4', host]
-        
+        command = _PING_COMMAND + [host]
+
         if VERBOSE:
             print(f"Executing command: {' '.join(command)}")
 
-        process = subprocess.run(command, capture_output=True, text=True, timeout=10)
-        output = process.stdout
-        
-        if system_os == 'Windows':
-            # Use regex to find packet loss and average latency
-            packet_loss_match = re.search(r'\((\d+)% loss\)', output)
-            avg_latency_match = re.search(r'Average = (\d+)ms', output)
-            
-            packet_loss = int(packet_loss_match.group(1)) if packet_loss_match else 100
-            avg_latency = int(avg_latency_match.group(1)) if avg_latency_match else -1
-            
-        else:  # Linux, macOS, etc.
-            # Use regex to find packet loss and average latency
-            packet_loss_match = re.search(r'(\d+)% packet loss', output)
-            avg_latency_match = re.search(r'min/avg/max/mdev = [\d.]+/([\d.]+)/[\d.]+/[\d.]+ ms', output)
-
-            packet_loss = int(packet_loss_match.group(1)) if packet_loss_match else 100
-            # Convert average latency to integer
-            avg_latency = float(avg_latency_match.group(1)) if avg_latency_match else -1
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=10, close_fds=_CLOSE_FDS)
+        packet_loss, avg_latency = _parse_ping_output(process.stdout)
 
         success = packet_loss < 100
         return {
@@ -134,7 +355,39 @@ def check_connection(host):
             "avg_latency": -1
         }
 
+def get_cached_whois_info(ip_address):
+    """
+    Returns the cached WHOIS information for a given IP address, or None if
+    there is no entry or it has expired.
+    """
+    with _WHOIS_CACHE_LOCK:
+        cached = _WHOIS_CACHE.get(ip_address)
+        if cached and time.monotonic() - cached[0] < WHOIS_CACHE_TTL:
+            _WHOIS_CACHE.move_to_end(ip_address)
+            return cached[1]
+    return None
+
 def get_whois_info(ip_address):
+    """
+    Returns WHOIS information for a given IP address, using a cached result
+    when one is available and has not expired.
+    """
+    whois_info = get_cached_whois_info(ip_address)
+    if whois_info is not None:
+        return whois_info
+
+    # Failed lookups ("N/A") are cached too, so they are not retried every check
+    whois_info = lookup_whois_info(ip_address)
+
+    with _WHOIS_CACHE_LOCK:
+        _WHOIS_CACHE[ip_address] = (time.monotonic(), whois_info)
+        _WHOIS_CACHE.move_to_end(ip_address)
+        while len(_WHOIS_CACHE) > WHOIS_CACHE_SIZE:
+            _WHOIS_CACHE.popitem(last=False)
+
+    return whois_info
+
+def lookup_whois_info(ip_address):
     """
     Performs a WHOIS lookup for a given IP address and returns a dictionary
     of relevant information.
@@ -144,23 +397,27 @@ def get_whois_info(ip_address):
         "country": "N/A"
     }
 
-    # Check if the IP is a private address
-    if ip_address.startswith(("192.168.", "10.", "172.16.", "172.17.", "172.18.", "172.19.", "172.20.", "172.21.", "172.22.", "172.23.", "172.24.", "172.25.", "172.26.", "172.27.", "172.28.", "172.29.", "172.30.", "172.31.")):
+    # Skip invalid, private, loopback and link-local addresses
+    try:
+        address = parse_ip_address(ip_address)
+    except ValueError:
+        return whois_info
+    if address.is_private or address.is_loopback or address.is_link_local:
         return whois_info
 
     try:
         # This requires the 'whois' command-line tool to be installed
-        whois_output = subprocess.check_output(['whois', ip_address], text=True, timeout=5)
+        whois_output = subprocess.check_output(['whois', ip_address], stderr=subprocess.DEVNULL, timeout=5, close_fds=_CLOSE_FDS)
         
         # Regex to find key information
-        org_name_match = re.search(r'(OrgName|organization|descr):\s+(.+)', whois_output, re.IGNORECASE)
-        country_match = re.search(r'(Country|country):\s+(.+)', whois_output, re.IGNORECASE)
+        org_name_match = _RE_WHOIS_ORG.search(whois_output)
+        country_match = _RE_WHOIS_COUNTRY.search(whois_output)
 
         if org_name_match:
-            whois_info["org_name"] = org_name_match.group(2).strip()
+            whois_info["org_name"] = org_name_match.group(1).decode('utf-8', 'replace').strip()
         
         if country_match:
-            whois_info["country"] = country_match.group(2).strip()
+            whois_info["country"] = country_match.group(1).decode('utf-8', 'replace').strip()
 
     except (subprocess.TimeoutExpired, FileNotFoundError, IndexError, ValueError, subprocess.CalledProcessError):
         # If whois command fails or parsing errors
@@ -168,96 +425,104 @@ def get_whois_info(ip_address):
     
     return whois_info
 
-def run_traceroute(host):
+def is_whois_candidate(hop):
+    """
+    Returns True if a WHOIS lookup for the hop could return useful information,
+    which excludes the first hop and any address that is not globally routable.
+    """
+    if hop['hop'] <= 1:
+        return False
+    try:
+        return parse_ip_address(hop['ip']).is_global
+    except ValueError:
+        return False
+
+def run_traceroute(host, whois=True):
     """
     Performs a traceroute to the specified host and returns a list of hops with
-    latency, hostnames, and WHOIS information.
+    latency, hostnames, and WHOIS information (only looked up if whois is True).
     """
-    system_os = platform.system()
     traceroute_results = []
     
     try:
         # Removed the -n flag to enable reverse DNS lookup for hostnames
-        if system_os == 'Windows':
-            command = ['tracert', '-w', '1000', host]  # -w sets timeout to 1 sec
-        else:
-            command = ['traceroute', '-w', '1', host] # -w sets timeout to 1 sec
+        command = _TRACEROUTE_COMMAND + [host]
         
         if VERBOSE:
             print(f"Executing command: {' '.join(command)}")
 
-        # Log the full traceroute output to a separate file for debugging
-        full_traceroute_output = subprocess.check_output(command, text=True, timeout=10)
-        with open("traceroute_log.txt", "a") as f:
-            f.write(f"\n--- Traceroute to {host} at {datetime.now()} ---\n")
-            f.write(full_traceroute_output)
+        # Stream the output so hops are parsed while traceroute is still running
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1, close_fds=_CLOSE_FDS)
+
+        # Kill traceroute if it takes longer than 10 seconds
+        timed_out = threading.Event()
+        def kill_traceroute():
+            timed_out.set()
+            process.kill()
+        timer = threading.Timer(10, kill_traceroute)
+        timer.start()
 
-        # Process the output for the console and log
-        lines = full_traceroute_output.splitlines()
+        output_lines = []
+        reached_host = False
+        try:
+            for line in process.stdout:
+                output_lines.append(line)
+                line = line.rstrip()
+                if not line:
+                    continue
+
+                hop = _parse_traceroute_line(line)
+                if hop:
+                    traceroute_results.append(hop)
+                    if hop['ip'] == host:
+                        # The destination has been reached, no need to wait for traceroute to finish
+                        reached_host = True
+                        process.terminate()
+                        break
+        finally:
+            timer.cancel()
+            process.stdout.close()
+            process.wait()
 
-        for line in lines:
-            if not line:
+        # Log the full traceroute output to a separate file for debugging
+        if _traceroute_log_file:
+            _traceroute_log_file.write(f"\n--- Traceroute to {host} at {time.strftime('%Y-%m-%d %H:%M:%S')} ---\n")
+            _traceroute_log_file.write("".join(output_lines))
+
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(command, 10)
+        if not reached_host and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+        # Look up WHOIS information in parallel, only for hops that are not cached.
+        # Hops are grouped by IP so an address repeated in the path is looked up once.
+        pending_hops = {}
+        for hop in traceroute_results:
+            if hop['whois'] is not None:
                 continue
-            
-            # Windows output parsing
-            if system_os == 'Windows':
-                match = re.search(r'^\s*(\d+)\s+[\d.<*]+ms\s+[\d.<*]+ms\s+[\d.<*]+ms\s+([a-zA-Z0-9.-]+)\s+\[([\d.]+|Request)\]', line)
-                if match:
-                    hop_num = int(match.group(1))
-                    hostname = match.group(2)
-                    ip_address = match(3).strip()
-                    whois_info = get_whois_info(ip_address)
-                    traceroute_results.append({
-                        "hop": hop_num,
-                        "hostname": hostname,
-                        "ip": ip_address,
-                        "latency": -1, # No simple latency data
-                        "whois": whois_info
-                    })
-                elif re.search(r'^\s*(\d+)\s+\* \*\s*\*.*', line):
-                    hop_num = int(line.strip().split()[0])
-                    traceroute_results.append({
-                        "hop": hop_num,
-                        "hostname": "Timed Out",
-                        "ip": "Timed Out",
-                        "latency": -1,
-                        "whois": {"org_name": "N/A", "country": "N/A"}
-                    })
-
-            # Unix/Linux/macOS output parsing
-            else:
-                match = re.search(r'^\s*(\d+)\s+([^\s]+)\s+\(([\d.]+)\).*?([\d.]+) ms', line)
-                if match:
-                    hop_num = int(match.group(1))
-                    hostname = match.group(2)
-                    ip_address = match.group(3)
-                    latency = float(match.group(4))
-                    whois_info = get_whois_info(ip_address)
-                    traceroute_results.append({
-                        "hop": hop_num,
-                        "hostname": hostname,
-                        "ip": ip_address,
-                        "latency": latency,
-                        "whois": whois_info
-                    })
-                elif re.search(r'^\s*\d+\s+\* \*\s*\*.*', line):
-                    hop_num = int(line.strip().split()[0])
-                    traceroute_results.append({
-                        "hop": hop_num,
-                        "hostname": "Timed Out",
-                        "ip": "Timed Out",
-                        "latency": -1,
-                        "whois": {"org_name": "N/A", "country": "N/A"}
-                    })
+            if not (whois and is_whois_candidate(hop)):
+                hop['whois'] = {"org_name": "N/A", "country": "N/A"}
+                continue
+            hop['whois'] = get_cached_whois_info(hop['ip'])
+            if hop['whois'] is None:
+                pending_hops.setdefault(hop['ip'], []).append(hop)
+        if pending_hops:
+            with ThreadPoolExecutor(max_workers=WHOIS_MAX_WORKERS) as executor:
+                futures = {executor.submit(get_whois_info, ip_address): ip_address for ip_address in pending_hops}
+                for future in as_completed(futures):
+                    whois_info = future.result()
+                    for hop in pending_hops[futures[future]]:
+                        hop['whois'] = whois_info
 
     except (subprocess.TimeoutExpired, FileNotFoundError, IndexError, ValueError, subprocess.CalledProcessError):
-        traceroute_results.append({
+        # Discard any hops parsed before the failure, they have no WHOIS information yet
+        traceroute_results = [{
             "hop": -1,
             "hostname": "Traceroute Failed",
             "ip": "Traceroute Failed",
             "latency": -1,
             "whois": {"org_name": "N/A", "country": "N/A"}
-        })
+        }]
 
     return traceroute_results
 
@@ -267,22 +532,30 @@ def get_network_interface_stats():
     Uses the psutil library to get total network bytes received and transmitted,
     as well as total packets dropped.
     This is a cross-platform and reliable method.
+    Returns the psutil counters, or None if they could not be retrieved, along
+    with an error message (or None).
     """
     try:
         # Get total network I/O counters for all interfaces
         net_io = psutil.net_io_counters(pernic=False, nowrap=True)
         if net_io:
-            bytes_received_gauge.set(net_io.bytes_recv)
-            bytes_transmitted_gauge.set(net_io.bytes_sent)
-            packets_dropped_gauge.set(net_io.dropin + net_io.dropout)
-            print(f"Network stats: Received {net_io.bytes_recv} bytes, Transmitted {net_io.bytes_sent} bytes. Dropped packets: {net_io.dropin + net_io.dropout}")
-        else:
-            print("Could not retrieve network I/O counters.")
-            bytes_received_gauge.set(0)
-            bytes_transmitted_gauge.set(0)
-            packets_dropped_gauge.set(0)
+            return net_io, None
+        return None, "Could not retrieve network I/O counters."
     except Exception as e:
-        print(f"Error getting network stats with psutil: {e}")
+        return None, f"Error getting network stats with psutil: {e}"
+
+def update_network_interface_metrics(net_io, error):
+    """
+    Updates the network interface metrics with the counters returned by
+    get_network_interface_stats() and prints them, or resets them on failure.
+    """
+    if net_io:
+        bytes_received_gauge.set(net_io.bytes_recv)
+        bytes_transmitted_gauge.set(net_io.bytes_sent)
+        packets_dropped_gauge.set(net_io.dropin + net_io.dropout)
+        print(f"Network stats: Received {net_io.bytes_recv} bytes, Transmitted {net_io.bytes_sent} bytes. Dropped packets: {net_io.dropin + net_io.dropout}")
+    else:
+        print(error)
         bytes_received_gauge.set(0)
         bytes_transmitted_gauge.set(0)
         packets_dropped_gauge.set(0)
@@ -293,10 +566,10 @@ def check_application_response_time(url):
     Returns the latency in milliseconds or -1 on failure.
     """
     try:
-        # Measure the time it takes to get a response
-        start_time = time.time()
-        response = requests.get(url, timeout=5)
-        end_time = time.time()
+        # Measure the time it takes to get a response, without downloading the body
+        start_time = time.perf_counter()
+        response = _HTTP_SESSION.head(url, allow_redirects=True, timeout=5)
+        end_time = time.perf_counter()
         response_time = (end_time - start_time) * 1000 # Convert to milliseconds
         response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
         return response_time
@@ -305,6 +578,44 @@ def check_application_response_time(url):
         return -1
 
 
+def update_prometheus_metrics(ping_result, traceroute_results, application_response_time):
+    """
+    Updates the Prometheus metrics with the results of a single monitoring cycle.
+    traceroute_results is None when the traceroute was skipped, which leaves its
+    metrics untouched. Per-hop latencies are updated separately with
+    update_hop_latency_metric().
+    """
+    PING_LATENCY_GAUGE.set(ping_result['avg_latency'])
+    PACKET_LOSS_GAUGE.set(ping_result['packet_loss'])
+    if traceroute_results is not None:
+        TRACEROUTE_HOPS_GAUGE.set(len(traceroute_results))
+
+    if application_response_time != -1:
+        APPLICATION_RESPONSE_TIME_GAUGE.set(application_response_time)
+
+def update_hop_latency_metric(hop):
+    """
+    Sets the latency metric for a single traceroute hop, reusing its metric child
+    if the hop was seen before, and returns the hop's label values.
+    """
+    key = (str(hop['hop']), hop['ip'], hop['hostname'])
+    child = _HOP_LATENCY_CHILDREN.get(key)
+    if child is None:
+        child = TRACEROUTE_HOP_LATENCY.labels(*key)
+        _HOP_LATENCY_CHILDREN[key] = child
+    child.set(hop['latency'])
+    return key
+
+def remove_stale_hop_latency_metrics(current_keys):
+    """
+    Removes the latency metrics of hops that are no longer part of the path.
+    """
+    for key in list(_HOP_LATENCY_CHILDREN):
+        if key not in current_keys:
+            TRACEROUTE_HOP_LATENCY.remove(*key)
+            del _HOP_LATENCY_CHILDREN[key]
+
+
 def main():
     """
     Main function to run the network monitoring loop.
@@ -312,7 +623,7 @@ def main():
     audit to determine network health, while also exposing metrics for Prometheus.
     """
     print("Starting network connection quality monitoring...")
-    print(f"Checking connections every {INTERVAL} seconds. Press Ctrl+C to stop.")
+    print(f"Checking connections every {INTERVAL:g} seconds. Press Ctrl+C to stop.")
 
     # Start the Prometheus metrics server in the background
     start_http_server(PROMETHEUS_PORT)
@@ -329,44 +640,53 @@ def main():
             print("Sound test complete.")
         except Exception as e:
             print(f"Sound test failed: {e}")
+        threading.Thread(target=sound_worker, daemon=True).start()
             
+    open_log_files()
+
     # Write a header to the log file to make it easier to read later.
-    with open(LOG_FILE, "a") as f:
-        f.write("--- Network Quality Monitoring Log --- \n")
-        f.write(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Monitoring host: {INTERNET_HOST}\n")
-        f.write("-------------------------------------\n")
+    _log_file.write("--- Network Quality Monitoring Log --- \n")
+    _log_file.write(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    _log_file.write(f"Monitoring host: {INTERNET_HOST}\n")
+    _log_file.write("-------------------------------------\n")
 
     try:
+        # Checks are scheduled against fixed monotonic deadlines so the time spent
+        # running them doesn't push every following check back.
+        next_check = time.monotonic()
+        # The number of consecutive checks with 100% packet loss
+        down_streak = 0
         while True:
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            current_time = time.strftime('%Y-%m-%d %H:%M:%S')
+
+            # During an outage, only run the slow checks when the streak is a power of two
+            backing_off = OUTAGE_BACKOFF_ENABLED and down_streak > 0 and (down_streak & (down_streak - 1)) != 0
             
-            # Check internet ping and perform traceroute
-            internet_ping_result = check_connection(INTERNET_HOST)
-            traceroute_results = run_traceroute(INTERNET_HOST)
-            get_network_interface_stats()
-            application_response_time = check_application_response_time(APPLICATION_URL)
+            # Run the ping, traceroute, network stats and application checks concurrently
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                ping_future = executor.submit(check_connection, INTERNET_HOST)
+                net_stats_future = executor.submit(get_network_interface_stats)
+                if not backing_off:
+                    traceroute_future = executor.submit(run_traceroute, INTERNET_HOST, WHOIS_ENABLED)
+                    app_response_future = executor.submit(check_application_response_time, APPLICATION_URL)
+
+                internet_ping_result = ping_future.result()
+                net_io, net_stats_error = net_stats_future.result()
+                if backing_off:
+                    # Skipped checks leave their metrics at the last measured values
+                    traceroute_results = None
+                    application_response_time = -1
+                else:
+                    traceroute_results = traceroute_future.result()
+                    application_response_time = app_response_future.result()
 
             # Determine overall status based on the internet ping
             packet_loss = internet_ping_result['packet_loss']
+            down_streak = down_streak + 1 if packet_loss == 100 else 0
             
-            # Update Prometheus metrics with the latest data
-            PING_LATENCY_GAUGE.set(internet_ping_result['avg_latency'])
-            PACKET_LOSS_GAUGE.set(packet_loss)
-            TRACEROUTE_HOPS_GAUGE.set(len(traceroute_results))
-            
-            if application_response_time != -1:
-                APPLICATION_RESPONSE_TIME_GAUGE.set(application_response_time)
-                
-            # Clear previous hop latencies before updating
-            TRACEROUTE_HOP_LATENCY.clear()
-            for hop in traceroute_results:
-                if hop['latency'] != -1:
-                    TRACEROUTE_HOP_LATENCY.labels(
-                        hop=str(hop['hop']),
-                        ip=hop['ip'],
-                        hostname=hop['hostname']
-                    ).set(hop['latency'])
+            # Update Prometheus metrics with the latest data, on the main thread
+            update_network_interface_metrics(net_io, net_stats_error)
+            update_prometheus_metrics(internet_ping_result, traceroute_results, application_response_time)
 
             # Determine color based on overall status
             if packet_loss == 0:
@@ -374,58 +694,68 @@ def main():
             elif packet_loss > 0 and packet_loss < 100:
                 color = YELLOW
                 if SOUND_ENABLED:
-                    # Use a thread to play the sound asynchronously to avoid blocking
-                    threading.Thread(target=play_sound_mac, args=(YELLOW_SOUND_PATH,), daemon=True).start()
+                    queue_sound(YELLOW_SOUND_PATH)
             else:
                 color = RED
                 if SOUND_ENABLED:
-                    # Use a thread to play the sound asynchronously to avoid blocking
-                    threading.Thread(target=play_sound_mac, args=(RED_SOUND_PATH,), daemon=True).start()
+                    queue_sound(RED_SOUND_PATH)
             
             # Prepare verbose console output
-            console_output = f"\n{current_time}"
-            console_output += f"\n--------------------------------------------"
+            output_parts = [f"\n{current_time}", "\n--------------------------------------------"]
             
             # Report on internet connection
             if internet_ping_result['success']:
-                console_output += f"\n- The internet connection is STABLE."
-                console_output += f" Latency is at {internet_ping_result['avg_latency']}ms with {packet_loss}% packet loss."
+                output_parts.append("\n- The internet connection is STABLE.")
+                output_parts.append(f" Latency is at {internet_ping_result['avg_latency']}ms with {packet_loss}% packet loss.")
             else:
-                console_output += f"\n- The internet connection is DOWN."
-                console_output += f" There is {packet_loss}% packet loss to the internet, indicating a complete outage."
+                output_parts.append("\n- The internet connection is DOWN.")
+                output_parts.append(f" There is {packet_loss}% packet loss to the internet, indicating a complete outage.")
 
             # Report on application response time
-            if application_response_time != -1:
-                console_output += f"\n- The application response time for {APPLICATION_URL} is {application_response_time:.2f}ms."
+            if backing_off:
+                output_parts.append("\n- Skipped the traceroute and application checks while the connection is down.")
+            elif application_response_time != -1:
+                output_parts.append(f"\n- The application response time for {APPLICATION_URL} is {application_response_time:.2f}ms.")
             else:
-                console_output += f"\n- Failed to get application response time for {APPLICATION_URL}."
-
-            # Add traceroute results with a more descriptive summary
-            if traceroute_results:
-                console_output += f"\n\nPath to {INTERNET_HOST}:"
+                output_parts.append(f"\n- Failed to get application response time for {APPLICATION_URL}.")
+
+            # Add traceroute results with a more descriptive summary, updating the
+            # hop latency metrics and checking for timed-out hops in the same pass
+            had_timeout = False
+            if traceroute_results is not None:
+                current_hop_keys = set()
+                if traceroute_results:
+                    output_parts.append(f"\n\nPath to {INTERNET_HOST}:")
                 for hop in traceroute_results:
                     if hop['latency'] != -1:
-                        console_output += f"\n  Hop {hop['hop']}: {hop['hostname']} ({hop['ip']}) ({hop['latency']}ms)"
+                        output_parts.append(_HOP_LINE_FORMAT.format_map(hop))
+                        current_hop_keys.add(update_hop_latency_metric(hop))
                     else:
-                        console_output += f"\n  Hop {hop['hop']}: {hop['hostname']} ({hop['ip']})"
+                        output_parts.append(_HOP_LINE_NO_LATENCY_FORMAT.format_map(hop))
+                        had_timeout = True
                     
                     if hop['whois']['org_name'] != "N/A":
-                        console_output += f"\n    - Owned by: {hop['whois']['org_name']}, Country: {hop['whois']['country']}"
+                        output_parts.append(_WHOIS_LINE_FORMAT.format_map(hop['whois']))
+                remove_stale_hop_latency_metrics(current_hop_keys)
             
+            console_output = "".join(output_parts)
             print(f"{color}{console_output}{RESET}")
 
             # Log a message to the file if there's any packet loss or a timed-out hop
-            if packet_loss > 0 or any(hop['latency'] == -1 for hop in traceroute_results):
-                with open(LOG_FILE, "a") as f:
-                    f.write(console_output + "\n")
+            if packet_loss > 0 or had_timeout:
+                _log_file.write(console_output + "\n")
             
-            # Wait for the specified interval before the next check.
-            time.sleep(INTERVAL)
+            # Wait until the next check is due, skipping any that were missed while
+            # this one was running rather than running them back-to-back.
+            next_check += INTERVAL
+            now = time.monotonic()
+            if next_check < now:
+                next_check += ((now - next_check) // INTERVAL + 1) * INTERVAL
+            time.sleep(max(0.0, next_check - now))
 
     except KeyboardInterrupt:
         print("\nMonitoring stopped by user.")
-        with open(LOG_FILE, "a") as f:
-            f.write(f"\nStopped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        _log_file.write(f"\nStopped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         
 if __name__ == "__main__":
     main()